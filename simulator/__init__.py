@@ -0,0 +1,3 @@
+"""
+End-to-end pre-generation simulator, run with ``python -m simulator``
+"""
@@ -0,0 +1,115 @@
+import argparse
+import importlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from simulator.interface import SimulatedServerInterface, PhaseTimer, PHASES
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog='python -m simulator', description='Measure the full pre-generation loop against a fake server process'
+    )
+    parser.add_argument('-n', '--slots', type=int, default=3, help='Amount of slots to pre-generate')
+    parser.add_argument('--world-size', type=float, default=16, help='MiB of region files per dimension')
+    parser.add_argument('--gen-time', type=float, default=5, help='Seconds to generate each dimension')
+    parser.add_argument('--startup-time', type=float, default=1, help='Seconds for the server to start up')
+    parser.add_argument('--save-time', type=float, default=1, help='Seconds for the server to save and exit')
+    parser.add_argument('--countdown', type=int, default=5, help='Countdown seconds before every restart')
+    parser.add_argument('--dimensions', nargs='+', default=['overworld', 'the_nether'])
+    parser.add_argument('--tiered', action='store_true', help='Enable tiered hot/cold slot storage')
+    parser.add_argument('--work-dir', help='Folder for the server and slots, a temporary one is used by default')
+    parser.add_argument('--keep', action='store_true', help='Keep the work folder after simulation')
+    parser.add_argument('--timeout', type=float, default=3600, help='Give up after this amount of seconds')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Show debug logs and server output')
+    return parser.parse_args()
+
+
+def format_report(totals: dict, wall_time: float, slots: int, migration_time: float, timed_out: bool) -> str:
+    lines = ['WARNING: simulation timed out, the session was not finished'] if timed_out else []
+    lines += [
+        f'Slots generated: {slots}',
+        f'Wall time: {wall_time:.2f}s',
+        f'Throughput: {slots / wall_time * 3600 if wall_time > 0 else 0:.2f} slots/hour',
+        '',
+        f"{'Phase':<14}{'Total (s)':>12}{'Per slot (s)':>14}{'Share':>9}",
+    ]
+    for phase in PHASES:
+        total = totals[phase]
+        lines.append(f'{phase:<14}{total:>12.3f}{total / max(slots, 1):>14.3f}{total / wall_time if wall_time > 0 else 0:>9.1%}')
+    lines += ['', f'Migration left after session: {migration_time:.3f}s']
+    return '\n'.join(lines)
+
+
+def main():
+    args = parse_args()
+    work_dir = os.path.abspath(args.work_dir or tempfile.mkdtemp(prefix='pregen-sim-'))
+    config_overrides = {
+        'backup_path': os.path.join(work_dir, 'pre-generated'),
+        'server_path': os.path.join(work_dir, 'server'),
+        'countdown_time': args.countdown,
+        'wait_dimensions': args.dimensions,
+        'max_slots': max(args.slots, 10),
+        'tiered_storage': {'enabled': args.tiered, 'hot_path': os.path.join(work_dir, 'hot')},
+    }
+    psi = SimulatedServerInterface(work_dir, config_overrides, [], verbose=args.verbose)
+    psi.install()
+
+    # The plugin can only be imported once the stub interface is installed
+    plugin = importlib.import_module('tcuhc_pregen')
+    from tcuhc_pregen.config import config
+    from tcuhc_pregen.sessions import RunningSession, PreGenerationSession
+    from tcuhc_pregen.storage import storage
+
+    psi.server_args = [
+        '--dimensions', *config.wait_dimensions, '--world-names', *config.world_names,
+        '--world-size', str(args.world_size), '--gen-time', str(args.gen_time),
+        '--startup-time', str(args.startup_time), '--save-time', str(args.save_time)
+    ]
+    if config.regen_command is not None:
+        psi.server_args += ['--regen-command', config.regen_command]
+    plugin.on_load(psi, None)
+    psi.plugin = plugin
+    try:
+        psi.start()
+        psi.wait_until_startup()
+        psi.timer = PhaseTimer()
+
+        slots_before = len(storage.get_slots_info(allow_used=True))
+        started = time.time()
+        timed_out = False
+        RunningSession.queue.submit(PreGenerationSession(args.slots, 'simulated'))
+        while len(RunningSession.queue.running) > 0 or len(RunningSession.queue.queued) > 0:
+            if time.time() - started > args.timeout:
+                psi.logger.error('Simulation timed out')
+                timed_out = True
+                break
+            time.sleep(0.05)
+        psi.timer.switch(None)
+        wall_time = time.time() - started
+        slots = len(storage.get_slots_info(allow_used=True)) - slots_before
+
+        # Slots are only fully stored once migration settles, keep that apart from the session itself
+        migration_started = time.time()
+        if not storage.wait_for_migration(max(args.timeout - wall_time, 0)):
+            psi.logger.error('Migration did not settle before timeout')
+            timed_out = True
+        migration_time = time.time() - migration_started
+    finally:
+        psi.stop()
+        psi.wait_until_stop()
+        plugin.on_unload(psi)
+
+    print(format_report(psi.timer.totals, wall_time, slots, migration_time, timed_out))
+    if args.keep:
+        print(f'Work folder kept at {work_dir}')
+    else:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return 1 if timed_out else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""
+A fake Minecraft server process for the pre-generator simulator
+
+It writes world files of the given size for every dimension, then reports the generation as finished with the same
+log lines as TC UHC, and saves and exits when it's told to stop or regen. Worlds are only regenerated
+on the start after a regen, other starts keep the existing world
+"""
+import argparse
+import os
+import shutil
+import sys
+import time
+from threading import Event, Thread
+
+
+DIMENSION_FOLDERS = {
+    'overworld': 'region',
+    'the_nether': os.path.join('DIM-1', 'region'),
+    'the_end': os.path.join('DIM1', 'region'),
+}
+REGION_FILE_SIZE = 4 * 2 ** 20
+REGEN_MARKER_FILE = '.regen'
+BLOCK = os.urandom(2 ** 20)  # region data is already compressed, so keep it random
+
+
+def log(text: str):
+    print(f"[{time.strftime('%H:%M:%S')}] [Server thread/INFO]: {text}", flush=True)
+
+
+def write_region_files(folder: str, size: int, stopped: Event):
+    os.makedirs(folder, exist_ok=True)
+    index = 0
+    while size > 0 and not stopped.is_set():
+        file_size = min(size, REGION_FILE_SIZE)
+        with open(os.path.join(folder, f'r.{index}.0.mca'), 'wb') as f:
+            written = 0
+            while written < file_size:
+                written += f.write(BLOCK[:file_size - written])
+        size -= file_size
+        index += 1
+
+
+def generate(args: argparse.Namespace, stopped: Event):
+    regen = os.path.isfile(REGEN_MARKER_FILE) or not any(os.path.exists(world) for world in args.world_names)
+    if regen:
+        for world in args.world_names:
+            shutil.rmtree(world, ignore_errors=True)
+        if os.path.isfile(REGEN_MARKER_FILE):
+            os.remove(REGEN_MARKER_FILE)
+    time.sleep(args.startup_time)
+    log(f'Done ({args.startup_time:.3f}s)! For help, type "help"')
+    if not regen:
+        return
+    for dimension in args.dimensions:
+        started = time.time()
+        folder = os.path.join(args.world_names[0], DIMENSION_FOLDERS.get(dimension, os.path.join('dimensions', dimension, 'region')))
+        write_region_files(folder, int(args.world_size * 2 ** 20), stopped)
+        if stopped.wait(max(args.gen_time - (time.time() - started), 0)):
+            return
+        log(f'Pre-generating of {dimension} finished, took {round((time.time() - started) / 60, 2)}min')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake server process for the pre-generator simulator')
+    parser.add_argument('--dimensions', nargs='+', default=['overworld', 'the_nether'])
+    parser.add_argument('--world-names', nargs='+', default=['world'])
+    parser.add_argument('--world-size', type=float, default=16, help='MiB of region files written per dimension')
+    parser.add_argument('--gen-time', type=float, default=10, help='Seconds to generate each dimension')
+    parser.add_argument('--startup-time', type=float, default=1, help='Seconds before the server is done starting')
+    parser.add_argument('--save-time', type=float, default=1, help='Seconds to save the world before exiting')
+    parser.add_argument('--regen-command', default='uhc regen')
+    args = parser.parse_args()
+
+    stopped = Event()
+    generator = Thread(target=generate, args=(args, stopped), daemon=True)
+    generator.start()
+    for line in sys.stdin:
+        if line.strip() == args.regen_command:
+            with open(REGEN_MARKER_FILE, 'w'):
+                pass
+            break
+        if line.strip() == 'stop':
+            break
+    stopped.set()
+    generator.join()
+    log('Stopping the server')
+    log('Saving the game')
+    time.sleep(args.save_time)
+    log('Saved the game')
+
+
+if __name__ == '__main__':
+    main()
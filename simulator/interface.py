@@ -0,0 +1,214 @@
+import json
+import logging
+import os
+import re
+import subprocess
+import sys
+import time
+from queue import Queue
+from threading import RLock, Thread
+from typing import Any, Dict, List, Optional
+
+from mcdreforged.api.all import *
+from ruamel.yaml import YAML
+
+from simulator import fake_server
+
+
+LANG_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'lang', 'en_us.yml')
+LOG_PATTERN = re.compile(r'^\[\d\d:\d\d:\d\d] \[[^]]+]: (?P<content>.*)$')
+PHASES = ['countdown', 'stop', 'backup', 'restart', 'generation', 'log_matching']
+
+
+class SimulatedLogger(logging.Logger):
+    def debug(self, msg, *args, no_check: bool = False, **kwargs):
+        super(SimulatedLogger, self).debug(msg, *args, **kwargs)
+
+
+class PhaseTimer:
+    """
+    Split the wall time into the phases of a pre-generation cycle
+    """
+    def __init__(self):
+        self.__lock = RLock()
+        self.__phase: Optional[str] = None
+        self.__since = time.time()
+        self.totals: Dict[str, float] = {phase: 0.0 for phase in PHASES}
+
+    def switch(self, phase: Optional[str], only_from: Optional[List[Optional[str]]] = None):
+        with self.__lock:
+            if only_from is not None and self.__phase not in only_from:
+                return
+            now = time.time()
+            if self.__phase is not None:
+                self.totals[self.__phase] += now - self.__since
+            self.__phase, self.__since = phase, now
+
+
+class SimulatedServerInterface:
+    """
+    A stub of MCDR PluginServerInterface driving the fake server process instead of a real Minecraft server
+    """
+    def __init__(self, work_dir: str, config_overrides: Dict[str, Any], server_args: List[str], verbose: bool = False):
+        self.work_dir = work_dir
+        self.config_overrides = config_overrides
+        self.server_args = server_args
+        self.timer = PhaseTimer()
+        self.broadcasts: List[str] = []
+        self.plugin = None
+        self.logger = SimulatedLogger('PreGenSim')
+        self.logger.setLevel(logging.DEBUG if verbose else logging.INFO)
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter('[%(asctime)s] [%(threadName)s/%(levelname)s]: %(message)s'))
+        self.logger.addHandler(handler)
+        self.__verbose = verbose
+        self.__lock = RLock()
+        self.__process: Optional[subprocess.Popen] = None
+        self.__started = False
+        self.__infos: 'Queue[Info]' = Queue()
+        self.__translations = self.__load_translations()
+        Thread(target=self.__dispatch, name='TaskExecutor', daemon=True).start()
+
+    def install(self):
+        # The plugin fetches the interface from this singleton while it's being imported
+        ServerInterface._ServerInterface__global_instance = self
+
+    def as_plugin_server_interface(self) -> 'SimulatedServerInterface':
+        return self
+
+    # ---------------
+    #   Translation
+    # ---------------
+
+    @staticmethod
+    def __load_translations() -> Dict[str, str]:
+        def flatten(prefix: str, node: dict):
+            for key, value in node.items():
+                if isinstance(value, dict):
+                    flatten(f'{prefix}{key}.', value)
+                else:
+                    result[f'{prefix}{key}'] = value
+        result = {}
+        with open(LANG_FILE, 'r', encoding='UTF-8') as f:
+            flatten('', YAML(typ='safe').load(f))
+        return result
+
+    def tr(self, translation_key: str, *args, **kwargs) -> str:
+        text = self.__translations.get(translation_key, translation_key)
+        return text.format(*args, **kwargs)
+
+    def rtr(self, translation_key: str, *args, **kwargs) -> RTextBase:
+        # Both messages are broadcast right before the session counts down to stop the server
+        if translation_key.endswith('msg.start_pregen') or translation_key.endswith('msg.finished_load'):
+            self.timer.switch('countdown')
+        return RText(self.tr(translation_key, *args, **kwargs))
+
+    # ---------------
+    #     Plugin
+    # ---------------
+
+    def load_config_simple(self, default_config: dict = None, target_class=None, **kwargs):
+        return target_class.deserialize(dict(default_config, **self.config_overrides))
+
+    def save_config_simple(self, config, file_name: str = 'config.json', *, in_data_folder: bool = True, **kwargs):
+        if in_data_folder:
+            file_name = os.path.join(self.work_dir, 'config', file_name)
+        os.makedirs(os.path.dirname(file_name), exist_ok=True)
+        with open(file_name, 'w', encoding='UTF-8') as f:
+            json.dump(config.serialize(), f, indent=4, ensure_ascii=False)
+
+    def register_help_message(self, *args, **kwargs):
+        pass
+
+    def register_command(self, *args, **kwargs):
+        pass
+
+    def reload_plugin(self, *args, **kwargs):
+        pass
+
+    def get_self_metadata(self):
+        return None
+
+    def broadcast(self, text):
+        self.broadcasts.append(str(text))
+        self.logger.info(f'[Broadcast] {text}')
+
+    # ---------------
+    #     Server
+    # ---------------
+
+    def is_server_running(self) -> bool:
+        with self.__lock:
+            return self.__process is not None and self.__process.poll() is None
+
+    def is_server_startup(self) -> bool:
+        return self.is_server_running() and self.__started
+
+    def start(self) -> bool:
+        with self.__lock:
+            if self.is_server_running():
+                return False
+            self.timer.switch('restart')
+            self.__started = False
+            server_path = self.config_overrides['server_path']
+            os.makedirs(server_path, exist_ok=True)
+            self.__process = subprocess.Popen(
+                [sys.executable, fake_server.__file__] + self.server_args, cwd=server_path,
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, universal_newlines=True, bufsize=1
+            )
+            Thread(target=self.__read, args=(self.__process,), name='ServerReader', daemon=True).start()
+            return True
+
+    def execute(self, text: str):
+        with self.__lock:
+            if not self.is_server_running():
+                return
+            self.timer.switch('stop', only_from=['countdown'])
+            self.__process.stdin.write(text + '\n')
+            self.__process.stdin.flush()
+
+    def stop(self):
+        self.execute('stop')
+
+    def wait_until_stop(self):
+        with self.__lock:
+            process = self.__process
+        if process is not None:
+            process.wait()
+        self.timer.switch('backup', only_from=['stop'])
+
+    def wait_for_start(self):
+        self.wait_until_stop()
+
+    def wait_until_startup(self, timeout: float = 60):
+        deadline = time.time() + timeout
+        while not self.is_server_startup():
+            if time.time() > deadline:
+                raise TimeoutError('Fake server did not start up in time')
+            time.sleep(0.01)
+
+    def __read(self, process: subprocess.Popen):
+        for line in process.stdout:
+            line = line.rstrip('\n')
+            matched = LOG_PATTERN.match(line)
+            info = Info(source=InfoSource.SERVER, raw_content=line)
+            info.content = matched.group('content') if matched is not None else line
+            if info.content.startswith('Done ('):
+                self.__started = True
+                self.timer.switch('generation', only_from=['restart'])
+            if self.__verbose:
+                self.logger.debug(f'[Server] {info.content}')
+            self.__infos.put(info)
+
+    def __dispatch(self):
+        # Like MCDR, events are handled one by one on a single task executor thread
+        while True:
+            info = self.__infos.get()
+            if self.plugin is None:
+                continue
+            self.timer.switch('log_matching', only_from=['generation'])
+            try:
+                self.plugin.on_info(self, info)
+            except Exception:
+                self.logger.exception('Error occurred while dispatching info:')
+            self.timer.switch('generation', only_from=['log_matching'])
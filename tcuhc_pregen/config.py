@@ -13,6 +13,7 @@ class PermissionRequirements(Serializable):
     autoremove: int = 3
     confirm: int = 3
     abort: int = 3
+    queue: int = 1
 
 
 class KeywordsConfiguration(Serializable):
@@ -25,10 +26,19 @@ class KeywordsConfiguration(Serializable):
     ]
 
 
+class TieredStorageConfiguration(Serializable):
+    enabled: bool = False
+    hot_path: str = './pre-generated-hot'
+    hot_slots: int = 2
+    compress_level: int = 6
+    migrate_interval: int = 60
+
+
 class Configuration(Serializable):
     command_prefix: Union[str, List[str]] = ['!!upg', '!!pregen']
     max_slots: int = 10
     default_slots: int = 4
+    queue_workers: int = 3
     ignored_files: List[str] = [
         'session.lock'
     ]
@@ -44,6 +54,7 @@ class Configuration(Serializable):
         'world'
     ]
     keywords: KeywordsConfiguration = KeywordsConfiguration.get_default()
+    tiered_storage: TieredStorageConfiguration = TieredStorageConfiguration.get_default()
     permission_requirements: PermissionRequirements = PermissionRequirements.get_default()
 
     @property
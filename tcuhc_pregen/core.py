@@ -41,6 +41,10 @@ def pre_generate_worlds(src: CommandSource, num: int = config.default_slots, com
         src.reply(tr('error.not_avail').set_color(RColor.red))
         return
     generated_slot_num = len(storage.get_slots_info(allow_used=True))
+    for session in RunningSession.queue.running + RunningSession.queue.queued:
+        # Sessions carried over a reload are instances of the previous module's classes
+        if hasattr(session, 'remaining'):
+            generated_slot_num += session.remaining
     if generated_slot_num + num > config.max_slots:
         src.reply(tr('error.not_enough_slot'))
         return
@@ -52,7 +56,10 @@ def load_pre_generated_world(src: CommandSource, slot_name: Optional[str] = None
     if not RunningSession.is_avail():
         src.reply(tr('error.not_avail').set_color(RColor.red))
         return
-    slot_name = tuple(storage.get_slots_info().keys())[0] if slot_name is None else slot_name
+    if slot_name is None:
+        RunningSession.running_session = LoadSlotSession()
+        src.reply(tr('ask.load', tr('op.next_slot')) + '\n' + confirm_or_abort())
+        return
     get_slot(slot_name)
     RunningSession.running_session = LoadSlotSession(slot_name)
     src.reply(tr('ask.load', slot_name) + '\n' + confirm_or_abort())
@@ -92,6 +99,7 @@ def single_info(dir_name: str, used: bool = False):
 def reload_self(src: CommandSource, throw_session=False):
     if throw_session:
         RunningSession.clear()
+        RunningSession.queue.clear()
     global_psi.reload_plugin(global_psi.get_self_metadata().id)
     src.reply(tr('msg.reloaded'))
 
@@ -117,6 +125,7 @@ def info_slot(src: CommandSource, slot_name: str):
         single_info(slot_name, used=slot_info.used),
         tr('info.used', slot_info.used),
         tr('info.size', format_dir_size(storage.get_slot_size(slot_name))),
+        tr('info.tier', tr(f'tier.{storage.get_slot_tier(slot_name)}')),
         tr('info.time', time.strftime('%Y-%m-%d_%H-%M-%S', time.localtime(slot_info.timestamp))),
         tr('info.comment', slot_info.comment)
     ]
@@ -128,29 +137,31 @@ def confirm_current_work(src: CommandSource):
         src.reply(tr('error.no_session').set_color(RColor.red))
         return
     running_session = RunningSession.running_session
-    if running_session.is_running:
-        src.reply(tr('error.session_already_running').set_color(RColor.red))
-        return
-    try:
-        running_session.is_running = True
-        running_session.main()
-    except Exception as exc:
-        global_psi.logger.exception('Error occurred while running Pre-generator: ')
-        running_session.on_error(exc)
+    RunningSession.clear()
+    if RunningSession.queue.submit(running_session):
+        src.reply(tr('msg.started', running_session.describe()))
+    else:
+        src.reply(tr('msg.queued', running_session.describe(), len(RunningSession.queue.queued)))
 
 
 def abort_current_work(src: CommandSource):
     if RunningSession.is_avail():
         src.reply(tr('error.no_session').set_color(RColor.red))
         return
-    running_session = RunningSession.running_session
-    if running_session.is_running:
-        src.reply(tr('error.session_already_running').set_color(RColor.red))
-        return
     RunningSession.clear()
     src.reply(tr('msg.aborted'))
 
 
+def list_operations(src: CommandSource):
+    running, queued = RunningSession.queue.running, RunningSession.queue.queued
+    rt = [tr('msg.queue_title', len(running), len(queued))]
+    for session in running:
+        rt.append(RTextList(RText('[▶] ', color=RColor.green), session.describe()))
+    for session in queued:
+        rt.append(RTextList(RText('[…] ', color=RColor.gray), session.describe()))
+    src.reply(RTextBase.join('\n', rt))
+
+
 def register_command():
     def permed_literal(*cmd):
         perm = 1
@@ -186,6 +197,7 @@ def register_command():
         ),
         permed_literal('confirm').runs(lambda src: confirm_current_work(src)),
         permed_literal('abort').runs(lambda src: abort_current_work(src)),
+        permed_literal('queue').runs(lambda src: list_operations(src)),
         permed_literal('reload').runs(lambda src: reload_self(src)).then(
             Literal('--clear').runs(lambda src: reload_self(src, throw_session=True))
         ),
@@ -195,9 +207,8 @@ def register_command():
         permed_literal('autoremove').runs(lambda src: auto_remove_used_world(src))
     ]
     debug_nodes = [
-        permed_literal('status').runs(lambda src: src.reply('Current session status: {} Running: {}'.format(
-            RunningSession.is_avail(),
-            RunningSession.running_session.is_running if not RunningSession.is_avail() else False)))
+        permed_literal('status').runs(lambda src: src.reply('Current session status: {} Running: {} Queued: {}'.format(
+            RunningSession.is_avail(), len(RunningSession.queue.running), len(RunningSession.queue.queued))))
     ]
 
     for node in children_nodes:
@@ -0,0 +1,123 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import RLock
+from typing import List, Set, TYPE_CHECKING
+
+from mcdreforged.api.all import *
+
+from tcuhc_pregen.config import config
+from tcuhc_pregen.utils import global_psi, debug_log
+
+if TYPE_CHECKING:
+    from tcuhc_pregen.sessions import AbstractSession
+
+
+# Resources an operation may claim, either exclusively or shared
+RES_WORLD = 'world'     # the live world of the server
+RES_BACKUP = 'backup'   # the backup volume as a whole
+
+
+def slot_resource(slot_name: str) -> str:
+    return f'slot:{slot_name}'
+
+
+def is_conflicted(this: 'AbstractSession', other: 'AbstractSession') -> bool:
+    if len(this.exclusive_resources & (other.exclusive_resources | other.shared_resources)) > 0:
+        return True
+    return len(other.exclusive_resources & this.shared_resources) > 0
+
+
+class OperationQueue:
+    def __init__(self):
+        self.__lock = RLock()
+        self.__executor = ThreadPoolExecutor(max_workers=max(config.queue_workers, 1), thread_name_prefix='PreGen')
+        self.__queued: List['AbstractSession'] = []
+        self.__running: List['AbstractSession'] = []
+        self.__in_main: Set['AbstractSession'] = set()
+
+    @property
+    def queued(self) -> List['AbstractSession']:
+        with self.__lock:
+            return list(self.__queued)
+
+    @property
+    def running(self) -> List['AbstractSession']:
+        with self.__lock:
+            return list(self.__running)
+
+    def submit(self, session: 'AbstractSession') -> bool:
+        """
+        Queue an operation, returns True if it started immediately
+        """
+        with self.__lock:
+            self.__queued.append(session)
+            self.__schedule()
+            return session in self.__running
+
+    def finish(self, session: 'AbstractSession'):
+        with self.__lock:
+            if session in self.__running:
+                self.__running.remove(session)
+                session.is_running = False
+                debug_log(f'Operation finished: {type(session).__name__}')
+            self.__schedule()
+
+    def clear(self) -> int:
+        """
+        Drop queued operations and force running ones waiting for server logs to finish,
+        returns the amount of operations cleared
+        """
+        with self.__lock:
+            # Operations still inside main() are touching files, they keep their resources until they return
+            waiting = [session for session in self.__running if session not in self.__in_main]
+            for session in waiting:
+                session.is_running = False
+                self.__running.remove(session)
+            cleared = len(self.__queued) + len(waiting)
+            self.__queued = []
+            debug_log(f'Cleared {cleared} operation(s)')
+            self.__schedule()
+            return cleared
+
+    def on_info(self, info: Info):
+        for session in self.running:
+            if not session.is_running:
+                continue
+            try:
+                session.on_info(info)
+            except Exception as exc:
+                global_psi.logger.exception('Error occurred while running pre-generator:')
+                self.__on_error(session, exc)
+
+    def __schedule(self):
+        # An operation starts once it conflicts with neither a running one nor an earlier queued one,
+        # so conflicting operations always run in the order they were confirmed
+        with self.__lock:
+            waiting: List['AbstractSession'] = []
+            for session in list(self.__queued):
+                if any(is_conflicted(session, other) for other in self.__running + waiting):
+                    waiting.append(session)
+                    continue
+                self.__queued.remove(session)
+                self.__running.append(session)
+                session.is_running = True
+                self.__in_main.add(session)
+                debug_log(f'Operation started: {type(session).__name__}')
+                self.__executor.submit(self.__run, session)
+
+    def __run(self, session: 'AbstractSession'):
+        try:
+            session.main()
+        except Exception as exc:
+            global_psi.logger.exception('Error occurred while running Pre-generator: ')
+            self.__on_error(session, exc)
+        finally:
+            with self.__lock:
+                self.__in_main.discard(session)
+
+    def __on_error(self, session: 'AbstractSession', exc: Exception):
+        try:
+            session.on_error(exc)
+        except Exception:
+            global_psi.logger.exception('Error occurred while handling Pre-generator error: ')
+        finally:
+            self.finish(session)
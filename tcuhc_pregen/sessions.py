@@ -1,17 +1,20 @@
 import os
 import shutil
 from threading import RLock
-from typing import Optional
+from typing import Optional, Set
 from parse import parse
 from mcdreforged.api.all import *
 
 from tcuhc_pregen.config import config
-from tcuhc_pregen.storage import storage, SLOT_INFO_FILE
+from tcuhc_pregen.operations import OperationQueue, RES_WORLD, RES_BACKUP, slot_resource
+from tcuhc_pregen.storage import storage
 from tcuhc_pregen.utils import global_psi, tr, stop_and_wait, debug_log, cp, rm
 
 
 class RunningSession:
+    # Session awaiting confirmation, confirmed sessions are handed over to the operation queue
     running_session: Optional['AbstractSession'] = None
+    queue: OperationQueue = OperationQueue()
 
     @classmethod
     def is_avail(cls):
@@ -30,6 +33,14 @@ class AbstractSession:
     def __init__(self):
         self.__lock = RLock()
         self.is_running = False
+        self.exclusive_resources: Set[str] = set()
+        self.shared_resources: Set[str] = set()
+
+    def finish(self):
+        RunningSession.queue.finish(self)
+
+    def describe(self) -> RTextBase:
+        raise NotImplementedError
 
     def main(self):
         raise NotImplementedError
@@ -48,6 +59,15 @@ class PreGenerationSession(AbstractSession):
         self.__comment = comment
         self.__dimension_result = {dimension: False for dimension in config.wait_dimensions}
         self.__allow_info = False
+        self.exclusive_resources = {RES_WORLD}
+        self.shared_resources = {RES_BACKUP}
+
+    @property
+    def remaining(self) -> int:
+        return max(self.__num, 0)
+
+    def describe(self) -> RTextBase:
+        return tr('op.pregen', self.__num)
 
     def main(self):
         global_psi.broadcast(tr('msg.start_pregen', config.countdown_time))
@@ -75,29 +95,52 @@ class PreGenerationSession(AbstractSession):
                 self.__dimension_result = {dimension: False for dimension in config.wait_dimensions}
             if self.__num <= 0:
                 debug_log('Pre-generation finished, exiting')
-                RunningSession.clear()
+                self.finish()
 
     def on_error(self, exc: Exception):
         global_psi.start()
         global_psi.broadcast(tr('error.backup_failed', exc=str(exc)))
-        RunningSession.clear()
+        self.finish()
 
 
 class LoadSlotSession(AbstractSession):
-    def __init__(self, name: str):
+    def __init__(self, name: Optional[str] = None):
+        """
+        Leave name None to load the next unused slot, which is resolved when the session starts
+        """
         super(LoadSlotSession, self).__init__()
-        self.__slot_to_load = storage.slot_dir_path(name)
+        self.__name = name
+        self.__slot_to_load = None
         self.backed_up = []
         self.moved = []
         self.temp_folder = os.path.join(config.server_path, config.restore_temp_folder)
         self.finished_backup = False
-        if not os.path.isdir(self.__slot_to_load):
-            raise FileNotFoundError('This slot is not found')
+        if name is None:
+            # The slot is unknown until it starts, so keep every slot from being touched meanwhile
+            self.exclusive_resources = {RES_WORLD, RES_BACKUP}
+        else:
+            if not os.path.isdir(storage.slot_dir_path(name)):
+                raise FileNotFoundError('This slot is not found')
+            self.exclusive_resources = {RES_WORLD, slot_resource(name)}
+            self.shared_resources = {RES_BACKUP}
+
+    def describe(self) -> RTextBase:
+        return tr('op.load_next') if self.__name is None else tr('op.load', self.__name)
 
     def on_info(self, info: Info):
         pass
 
     def main(self):
+        # Slots may have been loaded or removed by operations queued before this one
+        if self.__name is None:
+            slots = tuple(storage.get_slots_info().keys())
+            if len(slots) == 0:
+                raise FileNotFoundError('No unused slot left')
+            self.__name = slots[0]
+        self.__slot_to_load = storage.slot_dir_path(self.__name)
+        if not os.path.isdir(self.__slot_to_load):
+            raise FileNotFoundError('This slot is not found')
+
         global_psi.broadcast(tr('msg.before_load', config.countdown_time))
         stop_and_wait(config.countdown_time)
         if not os.path.isdir(self.temp_folder):
@@ -106,7 +149,9 @@ class LoadSlotSession(AbstractSession):
 
         # back world files up
         for item in config.world_names:
-            cp(os.path.join(config.server_path, item), os.path.join(self.temp_folder, item))
+            if os.path.exists(os.path.join(config.server_path, item)):
+                cp(os.path.join(config.server_path, item), os.path.join(self.temp_folder, item))
+                self.backed_up.append(item)
 
         # remove current world file
         self.finished_backup = True
@@ -114,9 +159,7 @@ class LoadSlotSession(AbstractSession):
             rm(os.path.join(config.server_path, item))
 
         # copy file to server directory
-        for item in os.listdir(self.__slot_to_load):
-            if item != SLOT_INFO_FILE:
-                cp(os.path.join(self.__slot_to_load, item), os.path.join(config.server_path, item))
+        self.moved = storage.restore_slot(self.__name, config.server_path)
 
         shutil.rmtree(self.temp_folder)
 
@@ -124,33 +167,43 @@ class LoadSlotSession(AbstractSession):
         debug_log(os.path.basename(self.__slot_to_load))
         current_info.used = True
         current_info.save(os.path.basename(self.__slot_to_load))
+        storage.request_migration()
         global_psi.start()
-        RunningSession.clear()
+        self.finish()
 
     def on_error(self, exc: Exception):
-        RunningSession.clear()
-        if self.finished_backup:
-            for item in self.moved:
-                rm(os.path.join(config.server_path, item))
-            for item in self.backed_up:
-                cp(os.path.join(self.temp_folder, item), os.path.join(config.server_path, item))
-        if os.path.isdir(self.temp_folder):
-            shutil.rmtree(self.temp_folder)
-        global_psi.start()
+        global_psi.broadcast(tr('error.occurred', str(exc)))
+        try:
+            if self.finished_backup:
+                # A restore failing halfway leaves partial worlds that moved doesn't know about yet
+                for item in set(self.moved) | set(config.world_names):
+                    rm(os.path.join(config.server_path, item))
+                for item in self.backed_up:
+                    cp(os.path.join(self.temp_folder, item), os.path.join(config.server_path, item))
+            if os.path.isdir(self.temp_folder):
+                shutil.rmtree(self.temp_folder)
+        finally:
+            global_psi.start()
+            self.finish()
 
 
 class RemoveSlotSession(AbstractSession):
     def __init__(self, name: str):
         super(RemoveSlotSession, self).__init__()
         self.name = name
+        self.exclusive_resources = {slot_resource(name)}
+        self.shared_resources = {RES_BACKUP}
+
+    def describe(self) -> RTextBase:
+        return tr('op.remove', self.name)
 
     def main(self):
         storage.remove_slot(self.name)
         global_psi.broadcast(tr('msg.removed', self.name))
-        RunningSession.clear()
+        self.finish()
 
     def on_error(self, exc: Exception):
-        RunningSession.clear()
+        self.finish()
         global_psi.broadcast(tr('error.occurred', str(exc)))
 
     def on_info(self, info: Info):
@@ -160,14 +213,20 @@ class RemoveSlotSession(AbstractSession):
 class AutoRemoveSlotSession(AbstractSession):
     def __init__(self):
         super(AutoRemoveSlotSession, self).__init__()
+        self.slots = [slot_dir for slot_dir, slot_info in storage.get_slots_info(allow_used=True).items() if slot_info.used]
+        self.exclusive_resources = {slot_resource(slot_dir) for slot_dir in self.slots}
+        self.shared_resources = {RES_BACKUP}
+
+    def describe(self) -> RTextBase:
+        return tr('op.auto_remove', len(self.slots))
 
     def main(self):
-        num = storage.auto_remove()
+        num = storage.auto_remove(self.slots)
         global_psi.broadcast(tr('msg.auto_removed', num))
-        RunningSession.clear()
+        self.finish()
 
     def on_error(self, exc: Exception):
-        RunningSession.clear()
+        self.finish()
         global_psi.broadcast(tr('error.occurred', str(exc)))
 
     def on_info(self, info: Info):
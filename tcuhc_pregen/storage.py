@@ -1,8 +1,10 @@
 import json
 import os
 import shutil
+import tarfile
 import time
-from typing import Dict, Optional, Iterable
+from threading import Lock, RLock, Thread, Event
+from typing import Callable, Dict, Optional, Iterable, Set, List
 
 from mcdreforged.api.all import *  # \Lazy Import/
 
@@ -11,6 +13,7 @@ from tcuhc_pregen.utils import global_psi, debug_log, rm, cp
 
 
 SLOT_INFO_FILE = 'info.json'
+COLD_ARCHIVE_FILE = 'worlds.tar.gz'
 
 
 class SlotInfo(Serializable):
@@ -37,12 +40,109 @@ class SlotInfo(Serializable):
             return None
 
 
+class MigrationStopped(Exception):
+    pass
+
+
+class SlotStates:
+    """
+    Slot locks and slots being backed up, shared by every StorageManager across plugin reloads
+    """
+    def __init__(self):
+        self.lock = RLock()
+        self.writing: Set[str] = set()
+        self.__slot_locks: Dict[str, RLock] = {}
+
+    def get_slot_lock(self, slot_name: str) -> RLock:
+        with self.lock:
+            if slot_name not in self.__slot_locks:
+                self.__slot_locks[slot_name] = RLock()
+            return self.__slot_locks[slot_name]
+
+
+class TierMigrator(Thread):
+    def __init__(self, manager: 'StorageManager'):
+        super(TierMigrator, self).__init__(name='PreGenMigrator', daemon=True)
+        self.__manager = manager
+        self.__wake = Event()
+        self.__idle = Event()
+        self.__idle_lock = Lock()
+        self.__stopped = False
+
+    def request(self):
+        with self.__idle_lock:
+            self.__idle.clear()
+            self.__wake.set()
+
+    def wait_until_idle(self, timeout: Optional[float] = None) -> bool:
+        return self.__idle.wait(timeout)
+
+    @property
+    def stopped(self) -> bool:
+        return self.__stopped
+
+    def stop(self):
+        self.__stopped = True
+        self.__wake.set()
+
+    def run(self):
+        self.request()
+        while not self.__stopped:
+            with self.__idle_lock:
+                if not self.__wake.is_set():
+                    self.__idle.set()
+            self.__wake.wait(config.tiered_storage.migrate_interval)
+            with self.__idle_lock:
+                self.__idle.clear()
+                self.__wake.clear()
+            if self.__stopped:
+                break
+            try:
+                self.__manager.migrate(lambda: self.__stopped)
+            except Exception:
+                global_psi.logger.exception('Error occurred while migrating slots:')
+
+
 class StorageManager:
     def __init__(self):
         self.folder = config.backup_path
+        self.hot_folder = config.tiered_storage.hot_path
+        self.states = SlotStates()
+        self.__migrator: Optional[TierMigrator] = None
         if not os.path.isdir(self.folder):
             os.makedirs(self.folder)
 
+    @property
+    def is_tiered(self) -> bool:
+        return config.tiered_storage.enabled
+
+    def get_slot_lock(self, slot_name: str) -> RLock:
+        return self.states.get_slot_lock(slot_name)
+
+    def start_migrator(self):
+        if not self.is_tiered or self.__migrator is not None:
+            return
+        if not os.path.isdir(self.hot_folder):
+            os.makedirs(self.hot_folder)
+        self.__migrator = TierMigrator(self)
+        self.__migrator.start()
+
+    def stop_migrator(self):
+        if self.__migrator is not None:
+            # Wait for the current slot so no migration is left half-done for the next manager to trip over
+            self.__migrator.stop()
+            self.__migrator.join()
+            self.__migrator = None
+
+    def request_migration(self):
+        if self.__migrator is not None:
+            self.__migrator.request()
+
+    def wait_for_migration(self, timeout: Optional[float] = None) -> bool:
+        if self.__migrator is None:
+            return True
+        return self.__migrator.wait_until_idle(timeout)
+
     def get_slots_info(self, allow_used: bool = False, reverse: bool = False) -> Dict[str, SlotInfo]:
         slot_dirs = os.listdir(self.folder)
         slots_info: Dict[str, SlotInfo] = {slot: SlotInfo.load(slot) for slot in slot_dirs}
@@ -56,30 +156,183 @@ class StorageManager:
             available_slots_info.items(), key=lambda x: x[1].timestamp, reverse=reverse
         )}
 
-    def auto_remove(self) -> int:
+    def auto_remove(self, slots: Optional[Iterable[str]] = None) -> int:
+        slots = None if slots is None else set(slots)
         num = 0
         for slot_dir, slot_info in self.get_slots_info(allow_used=True).items():
+            if slots is not None and slot_dir not in slots:
+                continue
             try:
                 if slot_info.used:
-                    shutil.rmtree(self.slot_dir_path(slot_dir))
+                    self.remove_slot(slot_dir)
                     num += 1
             except:
                 pass
+        # Only files that are not slots are useless, slots being backed up have no info file yet
         for item in os.listdir(self.folder):
+            with self.states.lock:
+                if item in self.states.writing or SlotInfo.load(item) is not None:
+                    continue
             rm(os.path.join(self.folder, item))
+        self.request_migration()
         return num
 
     def remove_slot(self, slot_name: str):
         slot_path = self.slot_dir_path(slot_name)
         if not os.path.isdir(slot_path):
             raise FileNotFoundError
-        shutil.rmtree(slot_path)
+        with self.get_slot_lock(os.path.basename(slot_path)):
+            rm(self.hot_slot_path(os.path.basename(slot_path)))
+            shutil.rmtree(slot_path)
+        self.request_migration()
+
+    def hot_slot_path(self, slot_name: str) -> str:
+        return os.path.join(self.hot_folder, slot_name)
+
+    def get_slot_tier(self, slot_name: str) -> str:
+        slot_name = os.path.basename(self.slot_dir_path(slot_name))
+        if os.path.isdir(self.hot_slot_path(slot_name)):
+            return 'hot'
+        if os.path.isfile(os.path.join(self.slot_dir_path(slot_name), COLD_ARCHIVE_FILE)):
+            return 'cold'
+        return 'plain'
+
+    def restore_slot(self, slot_name: str, target_folder: str) -> List[str]:
+        """
+        Copy world files of a slot into target folder from the fastest tier it is in
+        """
+        slot_path = self.slot_dir_path(slot_name)
+        slot_name = os.path.basename(slot_path)
+        with self.get_slot_lock(slot_name):
+            if os.path.isdir(self.hot_slot_path(slot_name)):
+                debug_log(f'Restoring slot {slot_name} from hot tier')
+                return self.__copy_worlds(self.hot_slot_path(slot_name), target_folder)
+            return self.__restore_cold(slot_path, target_folder)
+
+    def __restore_cold(self, slot_path: str, target_folder: str, is_stopped: Callable[[], bool] = lambda: False) -> List[str]:
+        archive_path = os.path.join(slot_path, COLD_ARCHIVE_FILE)
+        if os.path.isfile(archive_path):
+            debug_log(f'Restoring slot {os.path.basename(slot_path)} from cold tier')
+            names = set()
+            with tarfile.open(archive_path, 'r:gz') as archive:
+                for member in archive:
+                    check_stopped(is_stopped)
+                    names.add(member.name.split('/')[0])
+                    if hasattr(tarfile, 'data_filter'):
+                        archive.extract(member, target_folder, filter='data')
+                    else:
+                        archive.extract(member, target_folder)
+            return list(names)
+        return self.__copy_worlds(slot_path, target_folder, is_stopped)
+
+    @staticmethod
+    def __copy_worlds(source_folder: str, target_folder: str, is_stopped: Callable[[], bool] = lambda: False) -> List[str]:
+        def copy_function(src: str, dst: str):
+            check_stopped(is_stopped)
+            return shutil.copy2(src, dst)
+
+        copied = []
+        for item in os.listdir(source_folder):
+            if item not in [SLOT_INFO_FILE, COLD_ARCHIVE_FILE, COLD_ARCHIVE_FILE + '.tmp']:
+                cp(os.path.join(source_folder, item), os.path.join(target_folder, item), copy_function=copy_function)
+                copied.append(item)
+        return copied
+
+    def migrate(self, is_stopped: Callable[[], bool] = lambda: False):
+        """
+        Keep the next slots to load uncompressed in hot tier and everything else compressed in cold tier
+        """
+        if not self.is_tiered:
+            return
+        slots_info = self.get_slots_info(allow_used=True)
+        unused_slots = [slot_dir for slot_dir, slot_info in slots_info.items() if not slot_info.used]
+        hot_slots = unused_slots[:max(config.tiered_storage.hot_slots, 0)]
+
+        # Promote before compressing so the next slot to load is ready as soon as possible
+        steps = [(self.__promote, slot_dir) for slot_dir in hot_slots]
+        steps += [(self.__compress, slot_dir) for slot_dir in slots_info.keys()]
+        steps += [(self.__evict, slot_dir) for slot_dir in slots_info.keys() if slot_dir not in hot_slots]
+        for step, slot_dir in steps:
+            try:
+                check_stopped(is_stopped)
+                step(slot_dir, is_stopped)
+            except MigrationStopped:
+                debug_log('Migration stopped')
+                return
+            except Exception:
+                # Slots may be removed by operations running meanwhile
+                if self.__is_slot_present(slot_dir):
+                    global_psi.logger.exception(f'Unable to migrate slot "{slot_dir}":')
+                else:
+                    debug_log(f'Slot {slot_dir} was removed while migrating')
+
+        # Hot copies of removed slots and interrupted promotions
+        for item in os.listdir(self.hot_folder):
+            if item not in slots_info.keys():
+                with self.get_slot_lock(item):
+                    rm(self.hot_slot_path(item))
+
+    def __is_slot_present(self, slot_name: str) -> bool:
+        return self.slot_dir_path(slot_name, ignore_exc=True) is not None
+
+    # The slow copying and compressing happen in temp paths without the slot lock, so a load never waits for them,
+    # the lock is only held to swap the results in
+
+    def __promote(self, slot_name: str, is_stopped: Callable[[], bool]):
+        hot_path = self.hot_slot_path(slot_name)
+        if os.path.isdir(hot_path) or not self.__is_slot_present(slot_name):
+            return
+        temp_path = hot_path + '.tmp'
+        rm(temp_path)
+        os.makedirs(temp_path)
+        try:
+            self.__restore_cold(self.slot_dir_path(slot_name), temp_path, is_stopped)
+            with self.get_slot_lock(slot_name):
+                if self.__is_slot_present(slot_name) and not os.path.isdir(hot_path):
+                    os.replace(temp_path, hot_path)
+                    debug_log(f'Promoted slot {slot_name} to hot tier')
+        finally:
+            rm(temp_path)
+
+    def __compress(self, slot_name: str, is_stopped: Callable[[], bool]):
+        def check(tarinfo: tarfile.TarInfo):
+            check_stopped(is_stopped)
+            return tarinfo
+
+        if not self.__is_slot_present(slot_name):
+            return
+        slot_path = self.slot_dir_path(slot_name)
+        archive_path = os.path.join(slot_path, COLD_ARCHIVE_FILE)
+        if os.path.isfile(archive_path):
+            return
+        temp_path = archive_path + '.tmp'
+        rm(temp_path)
+        worlds = [item for item in os.listdir(slot_path) if item not in [SLOT_INFO_FILE, COLD_ARCHIVE_FILE, os.path.basename(temp_path)]]
+        try:
+            with tarfile.open(temp_path, 'w:gz', compresslevel=config.tiered_storage.compress_level) as archive:
+                for item in worlds:
+                    archive.add(os.path.join(slot_path, item), arcname=item, filter=check)
+            with self.get_slot_lock(slot_name):
+                if self.__is_slot_present(slot_name) and not os.path.isfile(archive_path):
+                    os.replace(temp_path, archive_path)
+                    for item in worlds:
+                        rm(os.path.join(slot_path, item))
+                    debug_log(f'Compressed slot {slot_name} into cold tier')
+        finally:
+            rm(temp_path)
+
+    def __evict(self, slot_name: str, is_stopped: Callable[[], bool]):
+        hot_path = self.hot_slot_path(slot_name)
+        with self.get_slot_lock(slot_name):
+            if os.path.isdir(hot_path):
+                rm(hot_path)
+                debug_log(f'Evicted slot {slot_name} from hot tier')
 
     def get_default_slot_name(self):
         now_time = time.strftime('%Y-%m-%d_%H-%M-%S', time.localtime())
         target_folder = now_time
         while True:
-            if target_folder not in os.listdir(self.folder):
+            if target_folder not in os.listdir(self.folder) and target_folder not in self.states.writing:
                 break
             if not target_folder.endswith(' '):
                 target_folder += ' '
@@ -89,7 +342,16 @@ class StorageManager:
     def backup(self, world_names: Iterable[str], comment: str = ''):
         if not os.path.isdir(self.folder):
             os.makedirs(self.folder)
-        target_slot_dir_name = self.get_default_slot_name()
+        with self.states.lock:
+            target_slot_dir_name = self.get_default_slot_name()
+            self.states.writing.add(target_slot_dir_name)
+        try:
+            self.__backup(target_slot_dir_name, world_names, comment)
+        finally:
+            with self.states.lock:
+                self.states.writing.discard(target_slot_dir_name)
+
+    def __backup(self, target_slot_dir_name: str, world_names: Iterable[str], comment: str = ''):
         target_slot_dir_path = os.path.join(self.folder, target_slot_dir_name)
         if not os.path.isdir(target_slot_dir_path):
             os.makedirs(target_slot_dir_path)
@@ -118,6 +380,7 @@ class StorageManager:
         if any(succeeded.values()):
             slot_info = SlotInfo(timestamp=time.time(), used=False, comment=comment)
             slot_info.save(target_slot_dir_name)
+            self.request_migration()
         else:
             shutil.rmtree(target_slot_dir_path)
             raise FileNotFoundError('No world file specified found')
@@ -147,5 +410,10 @@ class StorageManager:
 storage = StorageManager()
 
 
+def check_stopped(is_stopped: Callable[[], bool]):
+    if is_stopped():
+        raise MigrationStopped
+
+
 def equal_path(path1: str, path2: str):
     return os.path.normpath(os.path.abspath(path1)) == os.path.normpath(os.path.abspath(path2))
@@ -13,7 +13,7 @@ global_psi = ServerInterface.get_instance().as_plugin_server_interface()
 DEBUG = False
 
 
-def cp(this_file: str, target_file: str, allow_not_found=True):
+def cp(this_file: str, target_file: str, allow_not_found=True, copy_function=shutil.copy2):
     if os.path.isfile(this_file):
         if os.path.basename(this_file) not in config.ignored_files:
             shutil.copy(this_file, target_file)
@@ -21,7 +21,8 @@ def cp(this_file: str, target_file: str, allow_not_found=True):
         else:
             debug_log(f'Ignored file {this_file}')
     elif os.path.isdir(this_file):
-        shutil.copytree(this_file, target_file, ignore=lambda path, files: set(filter(config.is_file_ignored, files)))
+        shutil.copytree(this_file, target_file, ignore=lambda path, files: set(filter(config.is_file_ignored, files)),
+                        copy_function=copy_function)
         debug_log(f'Copied folder "{this_file}" to "{target_file}"')
     else:
         debug_log(f'File {this_file} not found')